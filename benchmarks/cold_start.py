@@ -0,0 +1,124 @@
+"""
+Cold-start cost of one API worker: time to first response and peak RSS.
+
+Each trial starts a fresh interpreter, loads config.wsgi, serves one
+authenticated GET /tasks/ and exits. The full settings and the API-only
+settings (DJANGO_API_ONLY=1) are compared:
+
+    python benchmarks/cold_start.py --trials 10
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    'full': {},
+    'api-only': {'DJANGO_API_ONLY': '1'},
+}
+
+
+def prepare():
+    """Migrate the database named by DJANGO_DB_NAME and print a token."""
+    import django
+
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(username='bench', password='bench')
+    print(RefreshToken.for_user(user).access_token)
+
+
+def serve_once(token):
+    """Load the WSGI app, answer one request and report timings and RSS."""
+    import resource
+
+    began = time.perf_counter()
+    from config.wsgi import application
+    loaded = time.perf_counter()
+
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/tasks/',
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': 'Bearer ' + token,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+    }
+    statuses = []
+    body = b''.join(application(environ, lambda status, headers: statuses.append(status)))
+    answered = time.perf_counter()
+
+    print(json.dumps({
+        'status': statuses[0],
+        'body': len(body),
+        'load_ms': (loaded - began) * 1000,
+        'request_ms': (answered - loaded) * 1000,
+        'modules': len(sys.modules),
+        'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def run(args, env, *extra):
+    result = subprocess.run(
+        [sys.executable, __file__, *extra], env=env, cwd=ROOT,
+        capture_output=True, text=True, check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--trials', type=int, default=5)
+    parser.add_argument('--prepare', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--serve', metavar='TOKEN', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    sys.path.insert(0, str(ROOT))
+    if args.prepare:
+        return prepare()
+    if args.serve:
+        return serve_once(args.serve)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'DJANGO_DB_NAME': os.path.join(tmp, 'bench.sqlite3')}
+        token = run(args, env, '--prepare')
+
+        print(f"{'mode':<10} {'first response':>15} {'load':>9} {'request':>9} {'modules':>8} {'max RSS':>9}")
+        for mode, overrides in MODES.items():
+            samples = []
+            for _ in range(args.trials):
+                began = time.perf_counter()
+                sample = json.loads(run(args, {**env, **overrides}, '--serve', token))
+                sample['total_ms'] = (time.perf_counter() - began) * 1000
+                if not sample['status'].startswith('200'):
+                    raise SystemExit(f'{mode}: unexpected response {sample["status"]}')
+                samples.append(sample)
+
+            def median(key):
+                return statistics.median(sample[key] for sample in samples)
+
+            print(
+                f"{mode:<10} {median('total_ms'):>12.1f} ms {median('load_ms'):>6.1f} ms "
+                f"{median('request_ms'):>6.1f} ms {median('modules'):>8.0f} {median('rss_kb') / 1024:>6.1f} MB"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Mixed read/write load on /tasks/ against a file-backed SQLite database.
+
+Runs the full request stack (JWT auth, permissions, filters) from several
+worker processes at once, the way gunicorn workers share one database,
+and counts "database is locked" failures. Alongside them a maintenance
+process keeps taking the write lock for --hold seconds at a time (like a
+cron job or a long admin save), so writers really have to wait for each
+other. Use --baseline to run with Django's stock SQLite settings (rollback
+journal, 5s timeout, no pragmas) for comparison:
+
+    python benchmarks/task_concurrency.py
+    python benchmarks/task_concurrency.py --baseline
+"""
+import argparse
+import os
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100, help='requests per worker')
+    parser.add_argument('--write-ratio', type=float, default=0.5)
+    parser.add_argument('--hold', type=float, default=6.0,
+                        help='seconds the maintenance process holds the write lock (0 to disable)')
+    parser.add_argument('--baseline', action='store_true', help='stock SQLite settings, no pragmas')
+    return parser.parse_args()
+
+
+def setup(args, db_path):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings'
+    os.environ['DJANGO_DB_PROFILE'] = 'sqlite'
+    os.environ['DJANGO_DB_NAME'] = db_path
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    if args.baseline:
+        # must happen before the first connection is opened
+        settings.SQLITE_PRAGMAS = {}
+        settings.DATABASES['default']['OPTIONS'] = {}
+        settings.DATABASES['default']['CONN_MAX_AGE'] = 0
+    settings.ALLOWED_HOSTS = ['testserver']
+    settings.DEBUG = False
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        setup(args, os.path.join(tmp, 'bench.sqlite3'))
+
+        from django.contrib.auth.models import User
+        from django.db import OperationalError, connections, transaction
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from core.models import Project, Task
+
+        manager = User.objects.create_user(username='bench', password='bench')
+        project = Project.objects.create(name='Bench', manager=manager)
+        token = str(RefreshToken.for_user(manager).access_token)
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        start = context.Barrier(args.workers + 1)
+        done = context.Event()
+        queue = context.Queue()
+
+        def maintenance():
+            # يمسك قفل الكتابة أطول من مهلة Django الافتراضية (5 ثوان)
+            start.wait()
+            while not done.wait(0.5) and args.hold > 0:
+                with transaction.atomic():
+                    Task.objects.create(project=project, title='maintenance', assigned_to=manager)
+                    time.sleep(args.hold)
+            connections.close_all()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+            outcomes = []
+            start.wait()
+            for i in range(args.requests):
+                began = time.perf_counter()
+                try:
+                    if rng.random() < args.write_ratio:
+                        response = client.post('/tasks/', {
+                            'project': project.id,
+                            'title': f'task {seed}-{i}',
+                            'assigned_to': manager.id,
+                        })
+                    else:
+                        response = client.get('/tasks/', {'project': project.id})
+                    outcome = 'ok' if response.status_code < 400 else 'other'
+                except OperationalError as exc:
+                    outcome = 'locked' if 'locked' in str(exc) else 'other'
+                outcomes.append((outcome, time.perf_counter() - began))
+            connections.close_all()
+            queue.put(outcomes)
+
+        processes = [context.Process(target=worker, args=(n,)) for n in range(args.workers)]
+        holder = context.Process(target=maintenance)
+        holder.start()
+        began = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [item for _ in processes for item in queue.get()]
+        for process in processes:
+            process.join()
+        wall = time.perf_counter() - began
+        done.set()
+        holder.join()
+
+        results = {'ok': 0, 'locked': 0, 'other': 0}
+        for outcome, _ in outcomes:
+            results[outcome] += 1
+        latencies = [elapsed for _, elapsed in outcomes]
+        latencies.sort()
+        total = len(latencies)
+        print(f"mode:       {'baseline' if args.baseline else 'tuned'}")
+        print(f'requests:   {total} ({args.workers} workers, {args.write_ratio:.0%} writes)')
+        print(f"ok:         {results['ok']}")
+        print(f"locked:     {results['locked']}")
+        print(f"other err:  {results['other']}")
+        print(f'throughput: {total / wall:.1f} req/s')
+        print(f'p50:        {latencies[total // 2] * 1000:.1f} ms')
+        print(f'p99:        {latencies[int(total * 0.99) - 1] * 1000:.1f} ms')
+        connections.close_all()
+        return 1 if results['locked'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,12 +10,16 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -28,6 +32,11 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# API-only mode (DJANGO_API_ONLY=1) for short-lived API containers: every
+# request is a JWT-authenticated JSON call, so the admin, sessions, messages,
+# static files, templates and the browsable API are not loaded at all.
+API_ONLY = os.environ.get('DJANGO_API_ONLY') == '1'
+
 
 # Application definition
 
@@ -73,17 +82,149 @@ TEMPLATES = [
     },
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in (
+            'django.contrib.admin',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.staticfiles',
+        )
+    ]
+    # Bearer tokens are not sent automatically by browsers, so CSRF and
+    # clickjacking protection add nothing; DRF authenticates the user itself.
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+    TEMPLATES = []
+
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# The backend is selected with DJANGO_DB_PROFILE ('sqlite' or 'postgres').
+# Both profiles keep connections open between requests (CONN_MAX_AGE) so a
+# request does not pay for a new connection.
+
+DB_PROFILE = os.environ.get('DJANGO_DB_PROFILE', 'sqlite')
+
+DB_CONN_MAX_AGE = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 600))
+
+DB_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'OPTIONS': {
+            # seconds sqlite3 waits on a locked database before raising
+            'timeout': 20,
+        },
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DJANGO_DB_NAME', 'project_manager'),
+        'USER': os.environ.get('DJANGO_DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+        'HOST': os.environ.get('DJANGO_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DJANGO_DB_PORT', '5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        # PgBouncer in transaction pooling mode cannot keep named cursors
+        # open across transactions.
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DJANGO_DB_PGBOUNCER') == '1',
+    },
+}
+
+if DB_PROFILE not in DB_PROFILES:
+    raise ValueError(f'Unknown DJANGO_DB_PROFILE {DB_PROFILE!r}')
+
+DATABASES = {
+    'default': DB_PROFILES[DB_PROFILE],
+}
+
+# Read replicas: a comma-separated list of hosts (postgres) or database files
+# (sqlite). Each one becomes a 'replica_<n>' alias with the same settings as
+# 'default'. core.routers.PrimaryReplicaRouter sends safe-method API reads to
+# them; writes, and reads shortly after a user's own write, stay on 'default'.
+DATABASE_REPLICAS = []
+
+for index, location in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        ('NAME' if DB_PROFILE == 'sqlite' else 'HOST'): location.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Task sharding: a comma-separated list of hosts (postgres) or database files
+# (sqlite), each becoming a 'shard_<n>' alias. Task rows then live on the
+# shard picked for their project (TASK_SHARD_MAP, else project_id modulo the
+# number of shards); everything else stays on 'default'. Shards use the
+# core.shard_backends engines, which create core_task without foreign keys.
+TASK_SHARDS = []
+
+TASK_SHARD_MAP = {}
+
+TASK_SHARD_ENGINE = DATABASES['default']['ENGINE'].replace('django.db.backends.', 'core.shard_backends.')
+
+for index, location in enumerate(filter(None, os.environ.get('DJANGO_TASK_SHARDS', '').split(',')), 1):
+    alias = f'shard_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'ENGINE': TASK_SHARD_ENGINE,
+        ('NAME' if DB_PROFILE == 'sqlite' else 'HOST'): location.strip(),
     }
+    TASK_SHARDS.append(alias)
+
+if TESTING and DB_PROFILE == 'sqlite':
+    # Local SQLite files stand in for primary, replica and task shards. These
+    # aliases are only routed to by tests that list them in DATABASE_REPLICAS
+    # or TASK_SHARDS.
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_primary.sqlite3'}
+    DATABASES.setdefault('replica', {
+        **DATABASES['default'],
+        'TEST': {'NAME': BASE_DIR / 'test_replica.sqlite3'},
+    })
+    for alias in ('shard_1', 'shard_2'):
+        DATABASES.setdefault(alias, {
+            **DATABASES['default'],
+            'ENGINE': TASK_SHARD_ENGINE,
+            'TEST': {'NAME': BASE_DIR / f'test_{alias}.sqlite3'},
+        })
+
+DATABASE_ROUTERS = [
+    'core.routers.TaskShardRouter',
+    'core.routers.PrimaryReplicaRouter',
+]
+
+# Seconds a user's reads stay on the primary after one of their writes.
+REPLICA_READ_YOUR_WRITES_SECONDS = 5
+
+# The read-your-writes markers are kept in the default cache, which must be
+# shared by all workers when DATABASE_REPLICAS is set (checked by core.checks).
+# DJANGO_REDIS_URL (e.g. redis://cache:6379/0) needs the `redis` package.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+
+# Applied by core.signals on every new SQLite connection. WAL lets readers
+# run alongside the single writer, and busy_timeout makes writers wait for
+# the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
 }
 
 
@@ -138,6 +279,23 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
 }
 
+# Seconds a worker keeps a user's role and project memberships (core.roles).
+# Changes made in the same worker invalidate the entry when they commit.
+ROLE_CACHE_TTL = 60
+
+# Users kept in that cache per worker; the least recently used are evicted.
+ROLE_CACHE_MAX_USERS = 10000
+
+if API_ONLY:
+    # responses are English-only; skip loading translation catalogs
+    USE_I18N = False
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ['rest_framework.renderers.JSONRenderer']
+
+# /api/batch/: most sub-requests per batch, and threads serving the
+# sub-requests of read-only batches (1 runs them in the request thread).
+BATCH_MAX_REQUESTS = 25
+BATCH_MAX_WORKERS = 4
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
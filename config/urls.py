@@ -14,7 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -22,9 +22,14 @@ from rest_framework_simplejwt.views import (
 )
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('core.urls')),
     path('api/', include('core.urls')), 
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),  # تسجيل الدخول JWT
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'), # تجديد التوكن
 ]
+
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    # ✅ لوحة الإدارة غير محمّلة في وضع API فقط (DJANGO_API_ONLY)
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# ذاكرة خاصة بكل عملية: لا يراها باقي العمّال
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    """
+    Read-your-writes markers (core.routers.record_write) live in the default
+    cache, so with replicas every worker process must share that cache.
+    """
+    if not settings.DATABASE_REPLICAS:
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PER_PROCESS_CACHES:
+        return [Error(
+            f'DATABASE_REPLICAS is set but the default cache ({backend}) is not shared between processes.',
+            hint='Set DJANGO_REDIS_URL, or point CACHES at a shared backend (Redis, Memcached, database).',
+            id='core.E001',
+        )]
+    return []
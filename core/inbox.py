@@ -0,0 +1,152 @@
+import datetime
+import heapq
+
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+from . import sharding
+
+OPEN_STATUSES = ('todo', 'in_progress')
+
+
+def _task_aliases():
+    return sharding.task_shards() if sharding.enabled() else [DEFAULT_DB_ALIAS]
+
+
+def _fields(task):
+    from .models import TaskInbox
+
+    return {
+        'user_id': task.assigned_to_id,
+        'project_id': task.project_id,
+        'status': task.status,
+        'due_date': task.due_date or TaskInbox.NO_DUE_DATE,
+    }
+
+
+def can_see(user_id, project_id):
+    from .models import Project
+
+    return Project.objects.filter(
+        models.Q(manager_id=user_id) | models.Q(members=user_id), pk=project_id,
+    ).exists()
+
+
+def sync_task(task):
+    """Add, update or drop the inbox row of a task that was just saved."""
+    from .models import TaskInbox
+
+    rows = TaskInbox.objects.filter(task_id=task.pk)
+    if not can_see(task.assigned_to_id, task.project_id):
+        rows.delete()
+    elif not rows.update(**_fields(task)):
+        TaskInbox.objects.create(task_id=task.pk, **_fields(task))
+
+
+def remove_task(task_id):
+    from .models import TaskInbox
+
+    TaskInbox.objects.filter(task_id=task_id).delete()
+
+
+def sync_membership(user_id, project_id):
+    """Re-derive one user's rows for one project after their access to it changed."""
+    from .models import Task, TaskInbox
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        TaskInbox.objects.filter(user_id=user_id, project_id=project_id).delete()
+        if can_see(user_id, project_id):
+            alias = sharding.shard_for_project(project_id) if sharding.enabled() else DEFAULT_DB_ALIAS
+            tasks = Task.objects.using(alias).filter(project_id=project_id, assigned_to_id=user_id)
+            TaskInbox.objects.bulk_create([TaskInbox(task_id=task.pk, **_fields(task)) for task in tasks])
+
+
+def revoke_membership(user_id, project_id):
+    """
+    Drop a removed member's rows for the project, unless they can still see
+    it (they manage it, or another ProjectMember row remains).
+    """
+    from .models import TaskInbox
+
+    if not can_see(user_id, project_id):
+        TaskInbox.objects.filter(user_id=user_id, project_id=project_id).delete()
+
+
+def sync_status(queryset, status):
+    """
+    Mirror a bulk status UPDATE of `queryset` (which skips save signals).
+    Call it before the UPDATE, while the queryset still matches the tasks.
+    """
+    from .models import TaskInbox
+
+    task_ids = queryset.values('id')
+    if queryset.db != DEFAULT_DB_ALIAS:
+        # a shard cannot be used in a subquery on 'default'
+        task_ids = list(queryset.values_list('id', flat=True))
+    TaskInbox.objects.filter(task_id__in=task_ids).update(status=status)
+
+
+def expected_rows(user_id=None):
+    """Yield the TaskInbox rows that the current tasks and memberships call for."""
+    from .models import Project, ProjectMember, Task, TaskInbox
+
+    managers = dict(Project.objects.values_list('id', 'manager_id'))
+    members = set(ProjectMember.objects.values_list('project_id', 'user_id'))
+    for alias in _task_aliases():
+        tasks = Task.objects.using(alias).only('id', 'project_id', 'assigned_to_id', 'status', 'due_date')
+        if user_id is not None:
+            tasks = tasks.filter(assigned_to_id=user_id)
+        for task in tasks.iterator(chunk_size=2000):
+            if managers.get(task.project_id) == task.assigned_to_id or (task.project_id, task.assigned_to_id) in members:
+                yield TaskInbox(task_id=task.pk, **_fields(task))
+
+
+def rebuild(user_id=None, batch_size=1000):
+    """Replace the inbox (or one user's part of it) with expected_rows(). Returns the row count."""
+    from .models import TaskInbox
+
+    rows = TaskInbox.objects.all() if user_id is None else TaskInbox.objects.filter(user_id=user_id)
+    count = 0
+    batch = []
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        rows.delete()
+        for row in expected_rows(user_id):
+            batch.append(row)
+            if len(batch) == batch_size:
+                count += len(TaskInbox.objects.bulk_create(batch))
+                batch = []
+        count += len(TaskInbox.objects.bulk_create(batch))
+    return count
+
+
+def encode_cursor(row):
+    return f'{row[0].isoformat()}_{row[1]}'
+
+
+def decode_cursor(cursor):
+    due_date, _, task_id = cursor.partition('_')
+    return datetime.date.fromisoformat(due_date), int(task_id)
+
+
+def page(user, statuses, limit, after=None):
+    """
+    One page of `user`'s inbox as (due_date, task_id, project_id) tuples,
+    soonest due first, plus the cursor of the next page (or None).
+
+    Each status is one range scan of the (user, status, due_date, task_id)
+    index, starting after the cursor and stopping after `limit` + 1 rows.
+    """
+    from .models import TaskInbox
+
+    keyset = models.Q()
+    if after is not None:
+        keyset = models.Q(due_date__gt=after[0]) | models.Q(due_date=after[0], task_id__gt=after[1])
+    scans = [
+        TaskInbox.objects.filter(keyset, user=user, status=status)
+        .order_by('due_date', 'task_id')
+        .values_list('due_date', 'task_id', 'project_id')[:limit + 1]
+        for status in statuses
+    ]
+    rows = list(heapq.merge(*scans))[:limit + 1]
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
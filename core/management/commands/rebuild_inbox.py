@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import inbox
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the "my work" task inbox (TaskInbox) from tasks and project memberships.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='only rebuild the rows of this user id')
+
+    def handle(self, *args, **options):
+        count = inbox.rebuild(user_id=options['user'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt task inbox: {count} rows.'))
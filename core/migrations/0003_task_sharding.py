@@ -0,0 +1,20 @@
+# Generated by Django 4.2.21 on 2026-10-19 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
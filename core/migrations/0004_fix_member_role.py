@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def lowercase_member_role(apps, schema_editor):
+    # RegisterSerializer used to store 'Member', which is not one of the choices
+    Profile = apps.get_model('core', 'Profile')
+    Profile.objects.using(schema_editor.connection.alias).filter(role='Member').update(role='member')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_task_sharding'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_member_role, migrations.RunPython.noop, hints={'model_name': 'profile'}),
+    ]
@@ -0,0 +1,30 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from . import routers
+
+
+class ReplicaRoutingMixin:
+    """
+    Lets safe-method actions read from the replicas.
+
+    A user who wrote something in the last REPLICA_READ_YOUR_WRITES_SECONDS
+    keeps reading from the primary so they always see their own changes.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with routers.request_scope(request.method):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated and routers.recently_wrote(request.user):
+            routers.pin_primary()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            routers.record_write(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
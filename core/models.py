@@ -1,6 +1,10 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth.models import User
 
+from . import sharding
+
 class Project(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -19,6 +23,15 @@ class ProjectMember(models.Model):
     def __str__(self):
         return f'{self.user.username} in {self.project.name}'
 
+class TaskQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        # ✅ بدون using() صريح: الراوتر يختار القاعدة حسب مشروع المهمة الجديدة (التقسيم)
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Task(models.Model):
     STATUS_CHOICES = (
         ('todo', 'To Do'),
@@ -26,6 +39,8 @@ class Task(models.Model):
         ('done', 'Done'),
     )
 
+    # On a shard (see core.shard_backends) these references have no database
+    # constraint; CASCADE is then applied by core.signals.
     project = models.ForeignKey(Project, related_name='tasks', on_delete=models.CASCADE)
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -34,9 +49,46 @@ class Task(models.Model):
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TaskQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.pk is None and sharding.enabled():
+            self.pk = sharding.next_task_id()
+            kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
+
+
+class TaskInbox(models.Model):
+    """
+    Denormalized "my work" index: one row per task, owned by its assignee,
+    while the assignee can see the task's project. Kept in sync by core.inbox.
+    """
+    # مهام بلا تاريخ استحقاق تأتي في آخر القائمة
+    NO_DUE_DATE = datetime.date.max
+
+    user = models.ForeignKey(User, related_name='inbox', on_delete=models.CASCADE)
+    project = models.ForeignKey(Project, related_name='+', on_delete=models.CASCADE)
+    # The task may live on a shard, so this is a plain id, not a ForeignKey.
+    task_id = models.BigIntegerField(unique=True)
+    status = models.CharField(max_length=20)
+    due_date = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status', 'due_date', 'task_id'], name='inbox_user_status_due'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: task {self.task_id} ({self.status})'
+
+
+class TaskIdSequence(models.Model):
+    # صف واحد على القاعدة الأساسية يوزّع أرقام المهام عند تفعيل التقسيم
+    last_id = models.BigIntegerField(default=0)
+
 class Profile(models.Model):
     ROLE_CHOICES = (
         ('admin', 'Admin'),
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from .roles import get_roles
+
 
 class IsProjectManager(BasePermission):
     """
@@ -10,13 +12,15 @@ class IsProjectManager(BasePermission):
         # ✅ السماح الكامل للمشرف المطلق
         if request.user.is_superuser:
             return True
-        
+
+        roles = get_roles(request.user)
+
         # السماح بالقراءة لأي عضو في المشروع
         if request.method in SAFE_METHODS:
-            return obj.manager == request.user or request.user in obj.members.all()
+            return roles.can_view(obj.pk)
         
         # السماح بالتعديل والحذف فقط للمدير
-        return obj.manager == request.user
+        return obj.manager_id == request.user.pk
 
 
 
@@ -26,17 +30,17 @@ class IsTaskManagerOrAssignee(BasePermission):
         if request.user.is_superuser:
             return True
 
-        project = obj.project
+        # ✅ الأدوار والعضويات من الذاكرة المؤقتة (بدون تحميل obj.project)
+        roles = get_roles(request.user)
         
         if request.method in SAFE_METHODS:
             # ✅ القراءة متاحة فقط للمدير أو الأعضاء
-            return project.manager == request.user or request.user in project.members.all()
+            return roles.can_view(obj.project_id)
         
         # ✅ التعديل أو الإنشاء متاح للمدير أو المكلّف أو أي عضو في المشروع
         return (
-            project.manager == request.user or
-            obj.assigned_to == request.user or
-            request.user in project.members.all()  # ✅ ← هذا هو الإضافة الجديدة
+            roles.can_view(obj.project_id) or
+            obj.assigned_to_id == request.user.pk
         )
 
 
@@ -45,8 +49,9 @@ class IsAdminOrManager(BasePermission):
         # ✅ السماح الكامل للمشرف المطلق
         if request.user.is_superuser:
             return True
-        
-        # السماح فقط للأدمن (staff)
-        return request.user and request.user.is_authenticated and request.user.is_staff
-
 
+        if not (request.user and request.user.is_authenticated):
+            return False
+        
+        # السماح للأدمن (staff) أو لمن دوره admin / manager في الملف الشخصي
+        return request.user.is_staff or get_roles(request.user).role in ('admin', 'manager')
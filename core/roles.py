@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import routers
+
+
+class UserRoles:
+    """What one user is allowed to do: their Profile role and project memberships."""
+
+    __slots__ = ('role', 'managed', 'member_of')
+
+    def __init__(self, role, managed, member_of):
+        self.role = role
+        self.managed = managed
+        self.member_of = member_of
+
+    @property
+    def project_ids(self):
+        return self.managed | self.member_of
+
+    def manages(self, project_id):
+        return project_id in self.managed
+
+    def can_view(self, project_id):
+        return project_id in self.managed or project_id in self.member_of
+
+
+# ✅ ذاكرة مؤقتة على مستوى العملية: user_id -> (وقت الانتهاء, UserRoles)
+# الأقدم استخدامًا أولًا، وحجمها محدود بـ ROLE_CACHE_MAX_USERS
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Optional per-batch memo (see memo()); shared by the threads of one batch.
+_memo = ContextVar('roles_memo', default=None)
+
+
+def _load(user_id):
+    from .models import Profile, Project, ProjectMember
+
+    with routers.use_primary():
+        role = Profile.objects.filter(user_id=user_id).values_list('role', flat=True).first()
+        managed = frozenset(Project.objects.filter(manager_id=user_id).values_list('id', flat=True))
+        member_of = frozenset(ProjectMember.objects.filter(user_id=user_id).values_list('project_id', flat=True))
+    return UserRoles(role or 'member', managed, member_of)
+
+
+def _in_transaction():
+    # كتل TestCase الخارجية لا تُحسب (مثل فحص durable في Django)
+    blocks = connections[DEFAULT_DB_ALIAS].atomic_blocks
+    return any(not block._from_testcase for block in blocks)
+
+
+def get_roles(user):
+    """
+    The cached UserRoles for `user`, loading them on a miss.
+
+    Entries are dropped by the signal receivers in core.signals when a
+    Profile, Project or ProjectMember changes in this process, and expire
+    after ROLE_CACHE_TTL seconds so changes made by other workers show up.
+    At most ROLE_CACHE_MAX_USERS users are kept; the least recently used
+    one is evicted first.
+
+    Roles loaded inside a transaction may include changes that are later
+    rolled back, so they are not cached (only memoized, inside memo()).
+    """
+    memoized = _memo.get()
+    if memoized is not None and user.pk in memoized:
+        return memoized[user.pk]
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(user.pk)
+        if entry is not None:
+            _cache.move_to_end(user.pk)
+    if entry is None or entry[0] < now:
+        entry = (now + settings.ROLE_CACHE_TTL, _load(user.pk))
+        if not _in_transaction():
+            with _cache_lock:
+                _cache[user.pk] = entry
+                _cache.move_to_end(user.pk)
+                while len(_cache) > settings.ROLE_CACHE_MAX_USERS:
+                    _cache.popitem(last=False)
+    if memoized is not None:
+        memoized[user.pk] = entry[1]
+    return entry[1]
+
+
+@contextmanager
+def memo():
+    """
+    Resolve each user's roles at most once inside the block, even if their
+    process cache entry expires meanwhile. Used for the sub-requests of one
+    batch; contexts copied into worker threads share the same memo.
+    """
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+def invalidate(*user_ids):
+    memoized = _memo.get()
+    for user_id in user_ids:
+        with _cache_lock:
+            _cache.pop(user_id, None)
+        if memoized is not None:
+            memoized.pop(user_id, None)
+
+
+def invalidate_project(project_id):
+    """Drop every cached or memoized entry that mentions `project_id`."""
+    with _cache_lock:
+        entries = [(user_id, roles) for user_id, (_, roles) in _cache.items()]
+    entries += list((_memo.get() or {}).items())
+    invalidate(*{user_id for user_id, roles in entries if roles.can_view(project_id)})
+
+
+def invalidate_memoized():
+    """
+    Drop the users of the current memo, and every cached user who shares a
+    project with them. Used when the memo's batch was rolled back.
+    """
+    memoized = dict(_memo.get() or {})
+    project_ids = frozenset().union(*(roles.project_ids for roles in memoized.values()))
+    with _cache_lock:
+        sharing = [user_id for user_id, (_, roles) in _cache.items() if not roles.project_ids.isdisjoint(project_ids)]
+    invalidate(*memoized, *sharing)
+
+
+def clear():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,146 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import sharding
+
+
+class _RoutingState:
+    def __init__(self, primary):
+        self.primary = primary
+        self.replica = None
+
+
+# Same as rest_framework.permissions.SAFE_METHODS; kept local so loading the
+# router at startup does not import DRF.
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# ✅ حالة التوجيه الخاصة بالطلب الحالي (None خارج أي طلب => القراءة من الأساسية)
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def request_scope(method):
+    """
+    Route the reads made while handling one request.
+
+    Safe methods may read from a replica; anything else reads from the
+    primary for the whole request. A scope opened inside use_primary()
+    (e.g. a sub-request of a write batch) stays on the primary.
+    """
+    outer = _state.get()
+    primary = method not in SAFE_METHODS or (outer is not None and outer.primary)
+    token = _state.set(_RoutingState(primary=primary))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, whatever the request method."""
+    token = _state.set(_RoutingState(primary=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def pin_primary():
+    """Send the rest of the current request's reads to the primary."""
+    state = _state.get()
+    if state is not None:
+        state.primary = True
+
+
+def _write_key(user):
+    return f'db-routing:last-write:{user.pk}'
+
+
+def record_write(user):
+    """Keep `user` reading from the primary for the read-your-writes window."""
+    if not settings.DATABASE_REPLICAS:
+        return
+    from django.core.cache import cache
+
+    cache.set(_write_key(user), True, settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+
+def recently_wrote(user):
+    if not settings.DATABASE_REPLICAS:
+        return False
+    from django.core.cache import cache
+
+    return cache.get(_write_key(user), False)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to 'default'. Reads go to one of DATABASE_REPLICAS (the same one
+    for the whole request) when the current request_scope allows it.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.primary or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+class TaskShardRouter:
+    """
+    When TASK_SHARDS is set, sends Task reads and writes to the shard of the
+    task's project. Other models fall through to the next router.
+
+    A Task query without an instance hint cannot be routed; callers pick the
+    shard with .using() (see TaskViewSet).
+    """
+
+    def _is_task(self, model):
+        return model._meta.label_lower == 'core.task'
+
+    def _shard_for_hints(self, hints):
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if self._is_task(type(instance)):
+            return sharding.shard_for_project(instance.project_id) if instance.project_id else None
+        if instance._meta.label_lower == 'core.project' and instance.pk:
+            return sharding.shard_for_project(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if self._is_task(model) and sharding.enabled():
+            return self._shard_for_hints(hints)
+        return None
+
+    def db_for_write(self, model, **hints):
+        if self._is_task(model) and sharding.enabled():
+            return self._shard_for_hints(hints)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharding.enabled() and (self._is_task(type(obj1)) or self._is_task(type(obj2))):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # الأجزاء تحمل جدول المهام فقط (محركات core.shard_backends)
+        if getattr(connections[db], 'task_shard', False):
+            return app_label == 'core' and model_name == 'task'
+        return None
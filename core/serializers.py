@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import Project, Task, ProjectMember
 from .models import Profile
@@ -18,7 +19,7 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data['password']
         )
         # ❌ ما نعطي الدور من المستخدم - نخلي تلقائي Member
-        Profile.objects.create(user=user, role='Member')
+        Profile.objects.create(user=user, role='member')
         return user
 
 # Serializer لليوزر (مستخدمين المشروع)
@@ -51,4 +52,19 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = ['id', 'project', 'title', 'description', 'assigned_to', 'status', 'due_date', 'created_at']
\ No newline at end of file
+        fields = ['id', 'project', 'title', 'description', 'assigned_to', 'status', 'due_date', 'created_at']
+
+# Serializer لطلبات الدفعة (/api/batch/)
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.RegexField(r'^/', max_length=2000)
+    body = serializers.JSONField(required=False, default=dict)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.')
+        return value
@@ -0,0 +1,8 @@
+"""
+Database backends for the task shards ('shard_<n>' aliases in settings).
+
+A shard only holds the core_task table (see TaskShardRouter.allow_migrate).
+The projects and users its rows point to stay on 'default', so the shard
+backends create that table without FOREIGN KEY constraints. 'default' keeps
+its constraints.
+"""
@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import base, features
+
+
+class DatabaseFeatures(features.DatabaseFeatures):
+    # PostgreSQL adds foreign keys with ALTER TABLE after CREATE TABLE
+    supports_foreign_keys = False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    task_shard = True
+    features_class = DatabaseFeatures
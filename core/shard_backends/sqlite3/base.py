@@ -0,0 +1,17 @@
+from django.db.backends.sqlite3 import base, features, schema
+
+
+class DatabaseFeatures(features.DatabaseFeatures):
+    supports_foreign_keys = False
+
+
+class DatabaseSchemaEditor(schema.DatabaseSchemaEditor):
+    # SQLite writes foreign keys inline in CREATE TABLE
+    sql_create_inline_fk = None
+    sql_create_column_inline_fk = None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    task_shard = True
+    features_class = DatabaseFeatures
+    SchemaEditorClass = DatabaseSchemaEditor
@@ -0,0 +1,58 @@
+import heapq
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+
+def enabled():
+    return bool(settings.TASK_SHARDS)
+
+
+def task_shards():
+    return list(settings.TASK_SHARDS)
+
+
+def shard_for_project(project_id):
+    """The alias holding the tasks of `project_id` (explicit map first, then modulo)."""
+    shards = settings.TASK_SHARDS
+    return settings.TASK_SHARD_MAP.get(int(project_id)) or shards[int(project_id) % len(shards)]
+
+
+def locate_task(pk):
+    """The shard holding task `pk`, or None if no shard has it."""
+    from .models import Task
+
+    if not str(pk).isdigit():
+        return None
+    for alias in settings.TASK_SHARDS:
+        if Task.objects.using(alias).filter(pk=pk).exists():
+            return alias
+    return None
+
+
+def next_task_id():
+    """
+    Hand out a Task id that is unique across all shards.
+
+    Each shard has its own auto-increment counter, so ids come from a single
+    row on 'default' instead. The counter starts after the highest id already
+    stored anywhere, so sharding can be switched on over existing data.
+    """
+    from .models import Task, TaskIdSequence
+
+    sequences = TaskIdSequence.objects.using(DEFAULT_DB_ALIAS)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not sequences.filter(pk=1).update(last_id=models.F('last_id') + 1):
+            start = max(
+                Task.objects.using(alias).aggregate(last=models.Max('id'))['last'] or 0
+                for alias in [DEFAULT_DB_ALIAS, *settings.TASK_SHARDS]
+            )
+            sequences.get_or_create(pk=1, defaults={'last_id': start})
+            sequences.filter(pk=1).update(last_id=models.F('last_id') + 1)
+        return sequences.get(pk=1).last_id
+
+
+def merge_sorted(querysets, field='id'):
+    """Stream several per-shard querysets as one sequence ordered by `field`."""
+    return heapq.merge(*(queryset.order_by(field) for queryset in querysets), key=attrgetter(field))
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import inbox, roles, sharding
+from .models import Profile, Project, ProjectMember, Task
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    # ✅ ضبط اتصالات SQLite (WAL + busy timeout) عند فتح كل اتصال جديد
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(pre_delete, sender=Project)
+def delete_sharded_project_tasks(sender, instance, **kwargs):
+    # ✅ الحذف المتتالي لا يصل إلى قواعد الأجزاء، فنحذف مهام المشروع يدوياً
+    if sharding.enabled():
+        Task.objects.using(sharding.shard_for_project(instance.pk)).filter(project_id=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_user_tasks(sender, instance, **kwargs):
+    if sharding.enabled():
+        for alias in sharding.task_shards():
+            Task.objects.using(alias).filter(assigned_to_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_user_roles(sender, instance, using, **kwargs):
+    # مرة الآن (لباقي هذه المعاملة) ومرة بعد الحفظ النهائي: قد يكون خيط آخر
+    # قد حمّل الأدوار القديمة قبل الـ commit
+    user_id = instance.user_id
+    roles.invalidate(user_id)
+    transaction.on_commit(lambda: roles.invalidate(user_id), using=using)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_project_roles(sender, instance, using, **kwargs):
+    # المدير القديم (إن تغيّر) موجود ضمن المدخلات التي تذكر المشروع
+    manager_id, project_id = instance.manager_id, instance.pk
+
+    def invalidate():
+        roles.invalidate(manager_id)
+        roles.invalidate_project(project_id)
+
+    invalidate()
+    transaction.on_commit(invalidate, using=using)
+
+
+@receiver(post_save, sender=Task)
+def sync_task_inbox(sender, instance, raw=False, **kwargs):
+    # ✅ الإنشاء والتعديل وإعادة التكليف: تحديث صف المهمة في صندوق "مهامي"
+    if not raw:
+        inbox.sync_task(instance)
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_inbox(sender, instance, **kwargs):
+    inbox.remove_task(instance.pk)
+
+
+@receiver(post_save, sender=ProjectMember)
+def add_member_inbox(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        inbox.sync_membership(instance.user_id, instance.project_id)
+
+
+@receiver(post_delete, sender=ProjectMember)
+def revoke_member_inbox(sender, instance, **kwargs):
+    inbox.revoke_membership(instance.user_id, instance.project_id)
+
+
+@receiver(pre_save, sender=Project)
+def remember_project_manager(sender, instance, raw=False, using=None, **kwargs):
+    instance._previous_manager_id = None
+    if instance.pk and not raw:
+        instance._previous_manager_id = (
+            Project.objects.using(using).filter(pk=instance.pk).values_list('manager_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Project)
+def sync_manager_inbox(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_manager_id', None)
+    if not created and previous is not None and previous != instance.manager_id:
+        inbox.sync_membership(previous, instance.pk)
+        inbox.sync_membership(instance.manager_id, instance.pk)
@@ -1,12 +1,42 @@
+import io
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
-from core.models import Project, Task, ProjectMember
+from core import inbox, roles, sharding
+from core.checks import check_replica_cache
+from core.models import Profile, Project, Task, TaskInbox, ProjectMember
+from core.permissions import IsAdminOrManager
+
+class APIUserMixin:
+    """مستخدمان (مدير وعضو) وذاكرة أدوار نظيفة، و authenticate() لتبديل التوكن."""
+
+    def setUp(self):
+        super().setUp()
+        roles.clear()
+        self.manager = User.objects.create_user(username='manager', password='managerpass')
+        self.member = User.objects.create_user(username='member', password='memberpass')
+
+    def authenticate(self, user):
+        token = str(RefreshToken.for_user(user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+
 
 class ProjectTaskAPITests(APITestCase):
 
     def setUp(self):
+        roles.clear()
         # إنشاء المستخدمين
         self.admin = User.objects.create_user(username='admin', password='adminpass')
         self.manager = User.objects.create_user(username='manager', password='managerpass')
@@ -244,3 +274,617 @@ class ProjectTaskAPITests(APITestCase):
         url = reverse('task-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SQLitePragmaTests(APITestCase):
+
+    def test_pragmas_applied_on_new_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(APIUserMixin, APITestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # نفس المستخدم موجود في القاعدتين (كما بعد النسخ المتماثل)
+        self.user = self.manager
+        User.objects.using('replica').create(id=self.user.id, username='manager')
+        self.authenticate(self.user)
+
+    def test_list_and_retrieve_read_from_replica(self):
+        project = Project.objects.using('replica').create(name='Replica Only', manager_id=self.user.id)
+
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([p['name'] for p in response.data], ['Replica Only'])
+
+        response = self.client.get(reverse('project-detail', args=[project.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_filtered_task_search_reads_from_replica(self):
+        project = Project.objects.using('replica').create(name='P', manager_id=self.user.id)
+        Task.objects.using('replica').create(project=project, title='Replica Task', assigned_to_id=self.user.id)
+
+        response = self.client.get(reverse('task-list') + f'?project={project.id}&search=Replica')
+        self.assertEqual([t['title'] for t in response.data], ['Replica Task'])
+
+    def test_writes_go_to_primary_and_reads_stick_after_write(self):
+        response = self.client.post(reverse('project-list'), {'name': 'Fresh', 'description': ''})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Project.objects.filter(name='Fresh').exists())
+        self.assertFalse(Project.objects.using('replica').filter(name='Fresh').exists())
+
+        # نافذة "اقرأ ما كتبت": القراءة التالية من القاعدة الأساسية
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([p['name'] for p in response.data], ['Fresh'])
+
+        cache.clear()
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual(response.data, [])
+
+    def test_failed_write_does_not_pin_primary(self):
+        response = self.client.post(reverse('task-list'), {'title': 'No project'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        Project.objects.using('replica').create(name='Replica Only', manager_id=self.user.id)
+
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([p['name'] for p in response.data], ['Replica Only'])
+
+    def test_replicas_require_shared_cache(self):
+        # الإعداد الافتراضي LocMemCache: كل عامل له ذاكرته الخاصة
+        self.assertEqual([e.id for e in check_replica_cache(None)], ['core.E001'])
+
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_replica_cache(None), [])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_replica_cache(None), [])
+
+
+@override_settings(TASK_SHARDS=['shard_1', 'shard_2'])
+class TaskShardingTests(APIUserMixin, APITestCase):
+    databases = {'default', 'shard_1', 'shard_2'}
+
+    def setUp(self):
+        super().setUp()
+        self.outsider = User.objects.create_user(username='outsider', password='outsiderpass')
+        self.project_a = Project.objects.create(name='A', manager=self.manager)
+        self.project_b = Project.objects.create(name='B', manager=self.manager)
+        ProjectMember.objects.create(project=self.project_a, user=self.member)
+        self.shard_a = sharding.shard_for_project(self.project_a.id)
+        self.shard_b = sharding.shard_for_project(self.project_b.id)
+        self.assertNotEqual(self.shard_a, self.shard_b)
+        self.authenticate(self.manager)
+
+    def test_created_tasks_live_on_their_project_shard(self):
+        a = self.client.post(reverse('task-list'), {'project': self.project_a.id, 'title': 'a', 'assigned_to': self.member.id})
+        b = self.client.post(reverse('task-list'), {'project': self.project_b.id, 'title': 'b', 'assigned_to': self.member.id})
+        self.assertEqual(a.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(b.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(a.data['id'], b.data['id'])
+
+        self.assertTrue(Task.objects.using(self.shard_a).filter(pk=a.data['id']).exists())
+        self.assertTrue(Task.objects.using(self.shard_b).filter(pk=b.data['id']).exists())
+        self.assertFalse(Task.objects.using('default').exists())
+
+    def test_project_filter_reads_single_shard(self):
+        Task.objects.create(project=self.project_a, title='a1', assigned_to=self.member)
+        Task.objects.create(project=self.project_b, title='b1', assigned_to=self.member)
+
+        with self.assertNumQueries(0, using=self.shard_b):
+            response = self.client.get(reverse('task-list') + f'?project={self.project_a.id}')
+        self.assertEqual([t['title'] for t in response.data], ['a1'])
+
+    def test_unfiltered_list_fans_out_and_merges_by_id(self):
+        titles = ['t1', 't2', 't3', 't4']
+        for title, project in zip(titles, [self.project_a, self.project_b, self.project_b, self.project_a]):
+            Task.objects.create(project=project, title=title, assigned_to=self.member, status='todo')
+
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual([t['title'] for t in response.data], titles)
+        ids = [t['id'] for t in response.data]
+        self.assertEqual(ids, sorted(ids))
+
+        response = self.client.get(reverse('task-list') + '?search=t3')
+        self.assertEqual([t['title'] for t in response.data], ['t3'])
+
+    def test_fan_out_respects_visibility(self):
+        Task.objects.create(project=self.project_a, title='a1', assigned_to=self.member)
+        Task.objects.create(project=self.project_b, title='b1', assigned_to=self.member)
+
+        self.authenticate(self.member)
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual([t['title'] for t in response.data], ['a1'])
+
+        self.authenticate(self.outsider)
+        response = self.client.get(reverse('task-list'))
+        self.assertEqual(response.data, [])
+
+    def test_detail_routes_find_task_on_its_shard(self):
+        task = Task.objects.create(project=self.project_b, title='b1', assigned_to=self.member)
+        url = reverse('task-detail', args=[task.id])
+
+        self.assertEqual(self.client.get(url).data['title'], 'b1')
+        response = self.client.patch(url, {'status': 'done'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Task.objects.using(self.shard_b).get(pk=task.id).status, 'done')
+
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_non_numeric_task_id_is_not_found(self):
+        response = self.client.get('/tasks/abc/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_moving_task_to_other_project_moves_shard(self):
+        ProjectMember.objects.create(project=self.project_b, user=self.member)
+        task = Task.objects.create(project=self.project_a, title='mover', assigned_to=self.member)
+        response = self.client.patch(reverse('task-detail', args=[task.id]), {'project': self.project_b.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Task.objects.using(self.shard_a).filter(pk=task.id).exists())
+        self.assertTrue(Task.objects.using(self.shard_b).filter(pk=task.id).exists())
+
+        # حذف النسخة القديمة يجب ألا يحذف سطر صندوق المهام
+        self.assertEqual(TaskInbox.objects.get(task_id=task.id).project_id, self.project_b.id)
+        self.assertEqual(
+            list(TaskInbox.objects.values_list('task_id', 'project_id')),
+            [(row.task_id, row.project_id) for row in inbox.expected_rows()],
+        )
+        self.authenticate(self.member)
+        response = self.client.get(reverse('task-mine'))
+        self.assertEqual([t['title'] for t in response.data['results']], ['mover'])
+
+    def test_transition_updates_every_shard(self):
+        Task.objects.create(project=self.project_a, title='a1', assigned_to=self.member, status='in_progress')
+        Task.objects.create(project=self.project_b, title='b1', assigned_to=self.member, status='in_progress')
+
+        response = self.client.post(reverse('task-transition'), {'filter': {'status': 'in_progress'}, 'status': 'done'}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(Task.objects.using(self.shard_a).get().status, 'done')
+        self.assertEqual(Task.objects.using(self.shard_b).get().status, 'done')
+
+    def test_mine_reads_tasks_from_their_shards(self):
+        Task.objects.create(project=self.project_b, title='b1', assigned_to=self.member, due_date='2025-01-02')
+        Task.objects.create(project=self.project_a, title='a1', assigned_to=self.member, due_date='2025-01-03')
+        ProjectMember.objects.create(project=self.project_b, user=self.member)
+        Task.objects.create(project=self.project_b, title='b2', assigned_to=self.member, due_date='2025-01-01')
+
+        self.authenticate(self.member)
+        response = self.client.get(reverse('task-mine'))
+        self.assertEqual([t['title'] for t in response.data['results']], ['b2', 'b1', 'a1'])
+
+    def test_deleting_project_deletes_its_sharded_tasks(self):
+        Task.objects.create(project=self.project_a, title='a1', assigned_to=self.member)
+        self.project_a.delete()
+        self.assertFalse(Task.objects.using(self.shard_a).exists())
+
+    def test_failed_batch_rolls_back_shard_writes(self):
+        task = Task.objects.create(project=self.project_b, title='b1', assigned_to=self.manager)
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'method': 'POST', 'path': '/tasks/', 'body': {'project': self.project_a.id, 'title': 'a1', 'assigned_to': self.member.id}},
+            {'method': 'PATCH', 'path': f'/tasks/{task.id}/', 'body': {'status': 'done'}},
+            {'method': 'DELETE', 'path': '/tasks/999999/'},
+        ]}, format='json')
+
+        results = response.data['responses']
+        self.assertEqual([r['status'] for r in results], [424, 424, 404])
+        self.assertIn('Rolled back', results[0]['body']['detail'])
+        self.assertFalse(Task.objects.using(self.shard_a).exists())
+        self.assertEqual(Task.objects.using(self.shard_b).get().status, 'todo')
+        self.assertFalse(TaskInbox.objects.filter(project=self.project_a).exists())
+
+    def test_failed_batch_leaves_no_rolled_back_project_in_role_cache(self):
+        roles.get_roles(self.manager)
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'method': 'POST', 'path': '/projects/', 'body': {'name': 'ghost', 'description': ''}},
+            {'method': 'GET', 'path': '/tasks/'},
+            {'method': 'DELETE', 'path': '/tasks/999999/'},
+        ]}, format='json')
+        self.assertEqual([r['status'] for r in response.data['responses']], [424, 424, 404])
+        self.assertNotIn(self.manager.pk, roles._cache)
+
+        # مشروع مستخدم آخر قد يأخذ رقم المشروع الملغى
+        project = Project.objects.create(name='theirs', manager=self.outsider)
+        Task.objects.create(project=project, title='secret', assigned_to=self.outsider)
+        self.assertEqual(roles.get_roles(self.manager).project_ids, {self.project_a.id, self.project_b.id})
+        response = self.client.get(reverse('task-list'))
+        self.assertNotIn('secret', [t['title'] for t in response.data])
+
+    def test_shards_hold_task_table_without_foreign_keys(self):
+        def schema(alias):
+            with connections[alias].cursor() as cursor:
+                tables = connections[alias].introspection.table_names(cursor)
+                return tables, connections[alias].introspection.get_relations(cursor, 'core_task')
+
+        tables, relations = schema(self.shard_a)
+        self.assertEqual([t for t in tables if t.startswith(('core_', 'auth_'))], ['core_task'])
+        self.assertEqual(relations, {})
+        # القاعدة الأساسية تحتفظ بالقيود
+        _, relations = schema('default')
+        self.assertEqual(sorted(relations), ['assigned_to_id', 'project_id'])
+
+
+class RoleCacheTests(APIUserMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='P', manager=self.manager)
+        self.membership = ProjectMember.objects.create(project=self.project, user=self.member)
+        self.task = Task.objects.create(project=self.project, title='T', assigned_to=self.manager)
+        self.authenticate(self.member)
+
+    def test_register_creates_member_profile(self):
+        self.client.credentials()
+        response = self.client.post(reverse('register'), {'username': 'new', 'email': 'n@example.com', 'password': 'NewPass123!'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Profile.objects.get(user__username='new').role, 'member')
+
+    def test_roles_loaded_once_per_process(self):
+        self.assertTrue(roles.get_roles(self.member).can_view(self.project.id))
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.get_roles(self.member).can_view(self.project.id))
+            self.assertFalse(roles.get_roles(self.member).manages(self.project.id))
+
+    @override_settings(ROLE_CACHE_MAX_USERS=2)
+    def test_role_cache_evicts_least_recently_used(self):
+        other = User.objects.create_user(username='other', password='otherpass')
+        roles.get_roles(self.member)
+        roles.get_roles(self.manager)
+        roles.get_roles(self.member)
+        roles.get_roles(other)
+
+        self.assertEqual(list(roles._cache), [self.member.pk, other.pk])
+        with self.assertNumQueries(0):
+            roles.get_roles(self.member)
+
+    def test_roles_loaded_in_transaction_are_not_cached(self):
+        with transaction.atomic():
+            self.assertTrue(roles.get_roles(self.member).can_view(self.project.id))
+        self.assertNotIn(self.member.pk, roles._cache)
+
+    def test_membership_change_invalidates_on_commit(self):
+        roles.get_roles(self.member)
+        stale = roles._cache[self.member.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.delete()
+            # خيط آخر يحمّل الأدوار القديمة قبل الـ commit
+            roles._cache[self.member.pk] = stale
+        self.assertNotIn(self.member.pk, roles._cache)
+        self.assertFalse(roles.get_roles(self.member).can_view(self.project.id))
+
+    def test_task_update_permission_needs_no_extra_queries(self):
+        url = reverse('task-detail', args=[self.task.id])
+        self.client.patch(url, {'title': 'warm'})
+        # المستخدم (JWT) + جلب المهمة + UPDATE + تحديث صندوق "مهامي" (2)، بدون استعلامات للصلاحيات
+        with self.assertNumQueries(5):
+            response = self.client.patch(url, {'title': 'changed'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_membership_removal_invalidates_cache(self):
+        url = reverse('task-detail', args=[self.task.id])
+        self.assertEqual(self.client.patch(url, {'title': 'ok'}).status_code, status.HTTP_200_OK)
+
+        self.membership.delete()
+        response = self.client.patch(url, {'title': 'denied'})
+        self.assertIn(response.status_code, [status.HTTP_403_FORBIDDEN, status.HTTP_404_NOT_FOUND])
+        self.assertFalse(roles.get_roles(self.member).can_view(self.project.id))
+
+    def test_new_project_invalidates_manager_cache(self):
+        self.assertEqual(roles.get_roles(self.member).managed, frozenset())
+        project = Project.objects.create(name='Mine', manager=self.member)
+        self.assertTrue(roles.get_roles(self.member).manages(project.id))
+
+    def test_admin_or_manager_uses_profile_role(self):
+        request = type('Request', (), {'user': self.member})()
+        self.assertFalse(IsAdminOrManager().has_permission(request, None))
+
+        Profile.objects.create(user=self.member, role='manager')
+        self.assertTrue(IsAdminOrManager().has_permission(request, None))
+
+
+class ApiOnlySettingsTests(SimpleTestCase):
+
+    def test_api_only_mode_drops_browser_apps(self):
+        script = (
+            "import django; django.setup()\n"
+            "from django.conf import settings\n"
+            "from django.core.management import call_command\n"
+            "from django.urls import resolve\n"
+            "call_command('check')\n"
+            "resolve('/tasks/')\n"
+            "print(','.join(settings.INSTALLED_APPS))\n"
+            "print(','.join(settings.MIDDLEWARE))\n"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.settings', 'DJANGO_API_ONLY': '1'}
+        result = subprocess.run(
+            [sys.executable, '-c', script], env=env, cwd=settings.BASE_DIR,
+            capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        apps, middleware = result.stdout.strip().splitlines()[-2:]
+        for app in ('admin', 'sessions', 'messages', 'staticfiles'):
+            self.assertNotIn(f'django.contrib.{app}', apps)
+        self.assertNotIn('Session', middleware)
+        self.assertNotIn('Csrf', middleware)
+
+
+class TaskTransitionTests(APIUserMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.outsider = User.objects.create_user(username='outsider', password='outsiderpass')
+        self.project = Project.objects.create(name='Sprint', manager=self.manager)
+        self.other_project = Project.objects.create(name='Other', manager=self.outsider)
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        for title, task_status in [('a', 'in_progress'), ('b', 'in_progress'), ('c', 'todo')]:
+            Task.objects.create(project=self.project, title=title, assigned_to=self.member, status=task_status)
+        self.foreign = Task.objects.create(project=self.other_project, title='x', assigned_to=self.outsider, status='in_progress')
+        self.url = reverse('task-transition')
+        self.authenticate(self.member)
+
+    def transition(self, filters, target):
+        return self.client.post(self.url, {'filter': filters, 'status': target}, format='json')
+
+    def test_moves_matching_tasks_in_one_update(self):
+        self.transition({'project': self.project.id}, 'todo')  # تسخين ذاكرة الأدوار
+        Task.objects.filter(title__in=['a', 'b']).update(status='in_progress')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.transition({'project': self.project.id, 'status': 'in_progress'}, 'done')
+        # المستخدم (JWT) + UPDATE واحد للمهام + UPDATE واحد لصندوق "مهامي"
+        statements = [q['sql'].split()[0] for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(statements, ['SELECT', 'UPDATE', 'UPDATE'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'status': 'done', 'updated': 2})
+        self.assertEqual(
+            dict(Task.objects.filter(project=self.project).values_list('title', 'status')),
+            {'a': 'done', 'b': 'done', 'c': 'todo'},
+        )
+
+    def test_only_visible_projects_are_touched(self):
+        response = self.transition({'status': 'in_progress'}, 'done')
+        self.assertEqual(response.data['updated'], 2)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'in_progress')
+
+        self.authenticate(User.objects.create_user(username='nobody', password='nobodypass'))
+        self.assertEqual(self.transition({}, 'done').data['updated'], 0)
+
+    def test_rejects_bad_status_and_filters(self):
+        self.assertEqual(self.transition({}, 'archived').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.transition({'project': 'abc'}, 'done').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'filter': 'status=todo', 'status': 'done'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, [1, 2], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Task.objects.filter(status='done').exists())
+
+
+@override_settings(BATCH_MAX_WORKERS=1)
+class BatchAPITests(APIUserMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = Project.objects.create(name='Dashboard', manager=self.manager)
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        self.task = Task.objects.create(project=self.project, title='T1', assigned_to=self.member)
+        self.authenticate(self.member)
+
+    def batch(self, *requests):
+        return self.client.post(reverse('batch'), {'requests': list(requests)}, format='json')
+
+    def test_read_batch_returns_responses_in_order(self):
+        response = self.batch(
+            {'method': 'GET', 'path': '/projects/'},
+            {'method': 'GET', 'path': f'/tasks/?project={self.project.id}'},
+            {'method': 'GET', 'path': f'/api/tasks/{self.task.id}/'},
+            {'method': 'GET', 'path': '/tasks/999999/'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['responses']
+        self.assertEqual([r['status'] for r in results], [200, 200, 200, 404])
+        self.assertEqual(results[0]['body'][0]['name'], 'Dashboard')
+        self.assertEqual([t['title'] for t in results[1]['body']], ['T1'])
+        self.assertEqual(results[2]['body']['id'], self.task.id)
+
+    def test_batch_authenticates_and_resolves_roles_once(self):
+        self.batch({'method': 'GET', 'path': '/projects/'})
+        requests = [{'method': 'GET', 'path': f'/tasks/{self.task.id}/'}] * 5
+        # المستخدم (JWT) مرة واحدة + استعلام واحد لكل طلب فرعي
+        with self.assertNumQueries(1 + 5):
+            response = self.batch(*requests)
+        self.assertEqual([r['status'] for r in response.data['responses']], [200] * 5)
+
+    def test_write_batch_runs_in_one_transaction(self):
+        response = self.batch(
+            {'method': 'POST', 'path': '/tasks/', 'body': {'project': self.project.id, 'title': 'New', 'assigned_to': self.member.id}},
+            {'method': 'PATCH', 'path': f'/tasks/{self.task.id}/', 'body': {'status': 'done'}},
+            {'method': 'GET', 'path': f'/tasks/?project={self.project.id}&status=done'},
+        )
+        results = response.data['responses']
+        self.assertEqual([r['status'] for r in results], [201, 200, 200])
+        self.assertEqual([t['title'] for t in results[2]['body']], ['T1'])
+        self.assertTrue(Task.objects.filter(title='New').exists())
+
+    def test_failed_write_rolls_back_batch(self):
+        response = self.batch(
+            {'method': 'POST', 'path': '/tasks/', 'body': {'project': self.project.id, 'title': 'New', 'assigned_to': self.member.id}},
+            {'method': 'PATCH', 'path': f'/tasks/{self.task.id}/', 'body': {'status': 'archived'}},
+            {'method': 'DELETE', 'path': f'/tasks/{self.task.id}/'},
+        )
+        self.assertEqual([r['status'] for r in response.data['responses']], [424, 400, 424])
+        self.assertFalse(Task.objects.filter(title='New').exists())
+        self.assertTrue(Task.objects.filter(pk=self.task.id).exists())
+
+    def test_rejects_invalid_batches(self):
+        self.assertEqual(self.batch().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch({'method': 'GET', 'path': 'tasks/'}).status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(BATCH_MAX_REQUESTS=2):
+            response = self.batch(*[{'method': 'GET', 'path': '/tasks/'}] * 3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.batch({'method': 'GET', 'path': '/api/batch/'}, {'method': 'GET', 'path': '/api/login/'})
+        self.assertEqual([r['status'] for r in response.data['responses']], [404, 404])
+
+        self.client.credentials()
+        response = self.batch({'method': 'GET', 'path': '/tasks/'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(BATCH_MAX_WORKERS=4)
+class ConcurrentBatchTests(APIUserMixin, TransactionTestCase):
+    client_class = APIClient
+
+    def test_read_only_batch_runs_on_thread_pool(self):
+        projects = [Project.objects.create(name=f'P{n}', manager=self.manager) for n in range(4)]
+        for project in projects:
+            Task.objects.create(project=project, title=f'task of {project.name}', assigned_to=self.manager)
+        self.authenticate(self.manager)
+
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'method': 'GET', 'path': f'/tasks/?project={project.id}'} for project in projects
+        ]}, format='json')
+        self.assertEqual(
+            [[t['title'] for t in r['body']] for r in response.data['responses']],
+            [[f'task of {project.name}'] for project in projects],
+        )
+
+
+class TaskInboxTests(APIUserMixin, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username='other', password='otherpass')
+        self.project = Project.objects.create(name='P', manager=self.manager)
+        self.membership = ProjectMember.objects.create(project=self.project, user=self.member)
+        ProjectMember.objects.create(project=self.project, user=self.other)
+        self.authenticate(self.member)
+
+    def task(self, title, due_date=None, task_status='todo', assignee=None):
+        return Task.objects.create(
+            project=self.project, title=title, status=task_status, due_date=due_date,
+            assigned_to=assignee or self.member,
+        )
+
+    def assertInboxConsistent(self):
+        def key(row):
+            return (row.user_id, row.project_id, row.task_id, row.status, row.due_date)
+        self.assertEqual({key(row) for row in TaskInbox.objects.all()}, {key(row) for row in inbox.expected_rows()})
+
+    def mine(self, query=''):
+        response = self.client.get(reverse('task-mine') + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_mine_lists_open_work_by_due_date(self):
+        self.task('later', '2025-03-01')
+        self.task('no date')
+        self.task('soon', '2025-01-01', 'in_progress')
+        self.task('finished', '2024-12-01', 'done')
+        self.task('not mine', '2024-01-01', assignee=self.other)
+
+        response = self.mine()
+        self.assertEqual([t['title'] for t in response.data['results']], ['soon', 'later', 'no date'])
+        self.assertIsNone(response.data['next'])
+        self.assertEqual([t['title'] for t in self.mine('?status=done').data['results']], ['finished'])
+
+    def test_mine_is_one_range_scan_per_status(self):
+        self.task('a', '2025-01-01')
+        self.task('b', '2025-01-02')
+        # المستخدم (JWT) + مسح نطاق واحد في الفهرس + جلب المهام بالمفتاح
+        with self.assertNumQueries(3):
+            response = self.mine('?status=todo')
+        self.assertEqual([t['title'] for t in response.data['results']], ['a', 'b'])
+
+    def test_mine_ignores_repeated_statuses(self):
+        self.task('a', '2025-01-01')
+        with self.assertNumQueries(3):
+            response = self.mine('?status=todo,todo')
+        self.assertEqual([t['title'] for t in response.data['results']], ['a'])
+
+    def test_mine_pages_with_cursor(self):
+        for day in range(1, 6):
+            self.task(f'd{day}', f'2025-01-0{day}')
+
+        first = self.mine('?limit=2')
+        self.assertEqual([t['title'] for t in first.data['results']], ['d1', 'd2'])
+        second = self.mine(f"?limit=2&after={first.data['next']}")
+        self.assertEqual([t['title'] for t in second.data['results']], ['d3', 'd4'])
+        third = self.mine(f"?limit=2&after={second.data['next']}")
+        self.assertEqual([t['title'] for t in third.data['results']], ['d5'])
+        self.assertIsNone(third.data['next'])
+
+        self.assertEqual(self.client.get(reverse('task-mine') + '?after=bad').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('task-mine') + '?status=archived').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inbox_follows_task_changes(self):
+        task = self.task('t', '2025-01-01')
+        self.assertInboxConsistent()
+
+        url = reverse('task-detail', args=[task.id])
+        self.client.patch(url, {'status': 'in_progress', 'due_date': '2025-02-01'})
+        self.assertEqual(TaskInbox.objects.get(task_id=task.id).status, 'in_progress')
+        self.assertInboxConsistent()
+
+        self.client.patch(url, {'assigned_to': self.other.id})
+        self.assertEqual(TaskInbox.objects.get(task_id=task.id).user_id, self.other.id)
+        self.assertEqual(self.mine().data['results'], [])
+        self.assertInboxConsistent()
+
+        self.client.delete(url)
+        self.assertFalse(TaskInbox.objects.exists())
+
+    def test_inbox_follows_bulk_transition(self):
+        self.task('a', task_status='in_progress')
+        self.task('b', task_status='in_progress')
+        self.client.post(reverse('task-transition'), {'filter': {'status': 'in_progress'}, 'status': 'done'}, format='json')
+        self.assertEqual(self.mine().data['results'], [])
+        self.assertInboxConsistent()
+
+    def test_inbox_follows_membership(self):
+        self.task('a', '2025-01-01')
+        self.membership.delete()
+        self.assertFalse(TaskInbox.objects.filter(user=self.member).exists())
+        self.assertInboxConsistent()
+
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        self.assertTrue(TaskInbox.objects.filter(user=self.member).exists())
+        self.assertInboxConsistent()
+
+    def test_duplicate_membership_keeps_inbox_when_one_is_removed(self):
+        task = self.task('a', '2025-01-01')
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        self.membership.delete()
+
+        self.assertTrue(TaskInbox.objects.filter(user=self.member, task_id=task.id).exists())
+        self.assertInboxConsistent()
+        self.assertEqual([t['title'] for t in self.mine().data['results']], ['a'])
+
+    def test_manager_keeps_own_tasks_and_manager_change_resyncs(self):
+        self.task('managed', assignee=self.manager)
+        ProjectMember.objects.create(project=self.project, user=self.manager).delete()
+        self.assertTrue(TaskInbox.objects.filter(user=self.manager).exists())
+
+        self.project.manager = self.other
+        self.project.save()
+        self.assertFalse(TaskInbox.objects.filter(user=self.manager).exists())
+        self.assertInboxConsistent()
+
+        self.project.delete()
+        self.assertFalse(TaskInbox.objects.exists())
+
+    def test_rebuild_command_restores_inbox(self):
+        self.task('a', '2025-01-01')
+        self.task('b', task_status='done', assignee=self.other)
+        TaskInbox.objects.all().delete()
+        TaskInbox.objects.create(user=self.manager, project=self.project, task_id=999, status='todo', due_date='2025-01-01')
+
+        call_command('rebuild_inbox', stdout=io.StringIO())
+        self.assertEqual(TaskInbox.objects.count(), 2)
+        self.assertInboxConsistent()
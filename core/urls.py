@@ -1,5 +1,6 @@
 from django.urls import path
 from .views_auth import RegisterView
+from .views_batch import BatchView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 
@@ -14,6 +15,7 @@ router.register(r'tasks', TaskViewSet, basename='task')
 
 urlpatterns = [
     path('api/register/', RegisterView.as_view(), name='register'),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     path('api/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('', include(router.urls)),
@@ -0,0 +1,145 @@
+import contextvars
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import roles, routers, sharding
+from .serializers import BatchSerializer
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # ✅ مجموعة خيوط واحدة لكل عملية، حتى تبقى اتصالات قاعدة البيانات مفتوحة بين الدفعات
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch',
+            )
+        return _executor
+
+
+class BatchView(APIView):
+    """
+    Run several API calls in one HTTP round trip.
+
+    Body: {"requests": [{"method": "GET", "path": "/tasks/?project=1"},
+                        {"method": "POST", "path": "/tasks/", "body": {...}}]}
+
+    The batch is authenticated once. Every sub-request reuses that user and
+    one roles memo (roles loaded by a write batch are never put in the
+    process cache). Read-only batches run on a thread pool. A batch with any
+    write runs in order inside one transaction on the primary and on every
+    task shard. It stops at the first failure and rolls back; the requests
+    that had succeeded then report 424 too.
+
+    The shard transactions are committed one after the other, not with a
+    two-phase commit.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        items = serializer.validated_data['requests']
+
+        with roles.memo():
+            if all(item['method'] in SAFE_METHODS for item in items):
+                responses = self.run_reads(request, items)
+            else:
+                responses = self.run_writes(request, items)
+        return Response({'responses': responses})
+
+    def run_reads(self, request, items):
+        if settings.BATCH_MAX_WORKERS <= 1 or len(items) == 1:
+            return [self.run_one(request, item) for item in items]
+
+        def run_in_worker(item):
+            close_old_connections()
+            try:
+                return self.run_one(request, item)
+            finally:
+                close_old_connections()
+
+        executor = _get_executor()
+        # كل خيط يحصل على نسخة من السياق (ذاكرة الأدوار المشتركة للدفعة)
+        futures = [
+            executor.submit(contextvars.copy_context().run, run_in_worker, item)
+            for item in items
+        ]
+        return [future.result() for future in futures]
+
+    def run_writes(self, request, items):
+        responses = []
+        aliases = [DEFAULT_DB_ALIAS, *(sharding.task_shards() if sharding.enabled() else [])]
+        with routers.use_primary(), ExitStack() as stack:
+            for alias in aliases:
+                stack.enter_context(transaction.atomic(using=alias))
+            for item in items:
+                response = self.run_one(request, item)
+                if response['status'] >= 400:
+                    break
+                responses.append(response)
+            else:
+                return responses
+            for alias in aliases:
+                transaction.set_rollback(True, using=alias)
+        # الأدوار المحمّلة أثناء الدفعة قد تذكر مشاريع تم التراجع عنها
+        roles.invalidate_memoized()
+        roles.invalidate(request.user.pk)
+
+        # ✅ ما نجح قبل الفشل تم التراجع عنه، فلا نعيد 200/201
+        rolled_back = {
+            'status': status.HTTP_424_FAILED_DEPENDENCY,
+            'body': {'detail': 'Rolled back: a later request in the batch failed.'},
+        }
+        not_run = {
+            'status': status.HTTP_424_FAILED_DEPENDENCY,
+            'body': {'detail': 'Not run: an earlier request in the batch failed.'},
+        }
+        skipped = len(items) - len(responses) - 1
+        return [rolled_back] * len(responses) + [response] + [not_run] * skipped
+
+    def run_one(self, request, item):
+        path, _, query = item['path'].partition('?')
+        try:
+            match = resolve(path)
+        except Resolver404:
+            match = None
+        view_class = getattr(match.func, 'cls', None) if match else None
+        if view_class is None or not view_class.__module__.startswith('core.') or view_class is type(self):
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}
+
+        response = match.func(self.build_request(request, item, path, query), *match.args, **match.kwargs)
+        return {'status': response.status_code, 'body': getattr(response, 'data', None)}
+
+    def build_request(self, request, item, path, query):
+        body = b'' if item['method'] in SAFE_METHODS else json.dumps(item['body']).encode()
+        environ = {key: value for key, value in request.META.items() if key != 'HTTP_AUTHORIZATION'}
+        environ.update({
+            'REQUEST_METHOD': item['method'],
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+        sub_request = WSGIRequest(environ)
+        # ✅ نفس المستخدم والتوكن بدون فك JWT مرة أخرى (يقرأها DRF في Request)
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+        return sub_request
@@ -4,14 +4,20 @@ from .models import Project, Task
 from .serializers import ProjectSerializer, TaskSerializer
 from .permissions import IsProjectManager, IsTaskManagerOrAssignee , IsAdminOrManager 
 from django.db import models
-from rest_framework.exceptions import PermissionDenied
+from django.db import router, transaction
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import TaskFilter
+from .mixins import ReplicaRoutingMixin
 from rest_framework.filters import SearchFilter
+from rest_framework.response import Response
+from . import inbox, sharding
+from .roles import get_roles
 
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ReplicaRoutingMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
 
     def get_queryset(self):
@@ -28,7 +34,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ReplicaRoutingMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_class = TaskFilter
@@ -36,10 +42,42 @@ class TaskViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return Task.objects.filter(
-            models.Q(project__manager=user) | 
-            models.Q(project__members=user)
-        ).distinct()
+        if not sharding.enabled():
+            return Task.objects.filter(
+                models.Q(project__manager=user) | 
+                models.Q(project__members=user)
+            ).distinct()
+
+        # ✅ مع التقسيم: المشاريع في القاعدة الأساسية والمهام في الأجزاء، فلا يوجد join
+        queryset = Task.objects.filter(project_id__in=get_roles(user).project_ids)
+        shard = self.get_shard()
+        return queryset.using(shard) if shard else queryset
+
+    def get_shard(self):
+        """
+        The one shard this request needs: the shard of ?project= when given,
+        else the shard holding the task named in the URL. None means fan out.
+        """
+        project = self.request.query_params.get('project')
+        if project and project.isdigit():
+            return sharding.shard_for_project(project)
+        if self.lookup_field in self.kwargs:
+            return sharding.locate_task(self.kwargs[self.lookup_field]) or sharding.task_shards()[0]
+        return None
+
+    def list(self, request, *args, **kwargs):
+        if not sharding.enabled() or self.get_shard():
+            return super().list(request, *args, **kwargs)
+
+        # بدون ?project=: نبحث في كل الأجزاء وندمج النتائج مرتبة حسب id
+        queryset = self.get_queryset()
+        tasks = list(sharding.merge_sorted(
+            self.filter_queryset(queryset.using(alias)) for alias in sharding.task_shards()
+        ))
+        page = self.paginate_queryset(tasks)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(tasks, many=True).data)
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:  # ✅ تم إضافة 'create'
@@ -51,6 +89,96 @@ class TaskViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         project = serializer.validated_data['project']
         # ✅ تم تعديل هذا الشرط ليسمح لأي عضو في المشروع أو المدير
-        if self.request.user != project.manager and self.request.user not in project.members.all():
+        if not get_roles(self.request.user).can_view(project.pk):
             raise PermissionDenied("Only the project manager or project members can create tasks.")
         serializer.save()
+
+    def perform_update(self, serializer):
+        old_shard = serializer.instance._state.db
+        task = serializer.save()
+        # نقل المهمة إلى مشروع في جزء آخر: الحفظ أنشأها هناك، نحذف النسخة القديمة
+        if sharding.enabled() and task._state.db != old_shard:
+            Task.objects.using(old_shard).filter(pk=task.pk).delete()
+            # post_delete للنسخة القديمة حذف سطر الصندوق، نعيده للنسخة الجديدة
+            inbox.sync_task(task)
+
+    @action(detail=False, methods=['post'])
+    def transition(self, request):
+        """
+        Move every task matching a TaskFilter expression to one status.
+
+        Body: {"filter": {"project": 1, "status": "in_progress"}, "status": "done"}
+
+        The permission check is the scoping itself: only tasks of projects the
+        user manages or is a member of can match (IsTaskManagerOrAssignee
+        grants them write access). Each database (one per shard when sharded)
+        then gets a single UPDATE.
+        """
+        if not isinstance(request.data, dict):
+            raise ValidationError({'non_field_errors': ['Expected an object with "filter" and "status".']})
+        target = request.data.get('status')
+        if target not in dict(Task.STATUS_CHOICES):
+            raise ValidationError({'status': [f'"{target}" is not a valid choice.']})
+        filters = request.data.get('filter', {})
+        if not isinstance(filters, dict):
+            raise ValidationError({'filter': ['Expected an object of task filters.']})
+
+        project = str(filters.get('project', ''))
+        if not sharding.enabled():
+            aliases = [router.db_for_write(Task)]
+        elif project.isdigit():
+            aliases = [sharding.shard_for_project(project)]
+        else:
+            aliases = sharding.task_shards()
+
+        scoped = Task.objects.filter(project_id__in=get_roles(request.user).project_ids)
+        querysets = []
+        for alias in aliases:
+            filterset = TaskFilter(filters, queryset=scoped.using(alias))
+            if not filterset.is_valid():
+                raise ValidationError(filterset.errors)
+            querysets.append(filterset.qs.exclude(status=target))
+
+        updated = 0
+        for queryset in querysets:
+            with transaction.atomic(using=queryset.db):
+                inbox.sync_status(queryset, target)
+                updated += queryset.update(status=target)
+        return Response({'status': target, 'updated': updated})
+
+    @action(detail=False, methods=['get'])
+    def mine(self, request):
+        """
+        Tasks assigned to the caller across all their projects, soonest due
+        first, read from the TaskInbox index instead of the task table.
+
+        ?status=todo,in_progress (default: open work), ?limit= (default 20,
+        max 100), ?after=<the "next" cursor of the previous page>.
+        """
+        # بدون تكرار (todo,todo يعني مسحًا واحدًا)، مع الحفاظ على الترتيب
+        statuses = list(dict.fromkeys(request.query_params.get('status', ','.join(inbox.OPEN_STATUSES)).split(',')))
+        if not set(statuses) <= set(dict(Task.STATUS_CHOICES)):
+            raise ValidationError({'status': ['Unknown status.']})
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            after = request.query_params.get('after')
+            after = inbox.decode_cursor(after) if after else None
+        except ValueError:
+            raise ValidationError({'detail': ['Invalid limit or cursor.']})
+        if limit < 1:
+            raise ValidationError({'limit': ['Must be at least 1.']})
+
+        rows, next_cursor = inbox.page(request.user, statuses, limit, after)
+
+        # جلب المهام بالمفتاح الأساسي (قاعدة واحدة، أو جزء كل مشروع عند التقسيم)
+        by_alias = {}
+        for _, task_id, project_id in rows:
+            alias = sharding.shard_for_project(project_id) if sharding.enabled() else None
+            by_alias.setdefault(alias, []).append(task_id)
+        tasks = {}
+        for alias, task_ids in by_alias.items():
+            queryset = Task.objects.using(alias) if alias else Task.objects.all()
+            tasks.update((task.pk, task) for task in queryset.filter(pk__in=task_ids))
+
+        ordered = [tasks[task_id] for _, task_id, _ in rows if task_id in tasks]
+        return Response({'results': self.get_serializer(ordered, many=True).data, 'next': next_cursor})